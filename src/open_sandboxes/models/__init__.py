@@ -1,4 +1,13 @@
-from typing import TypedDict
+from dataclasses import dataclass
+from functools import cached_property
+from typing import (
+    NamedTuple,
+    SupportsIndex,
+    TypedDict,
+    Union,
+    cast,
+    overload,
+)
 
 
 class PyprojectDependency(TypedDict):
@@ -11,9 +20,72 @@ class ExecCommandResponse(TypedDict):
     stderr: str
 
 
-class CodeOutput(TypedDict):
+class CodeOutput(NamedTuple):
+    """
+    The standard output and error output of a code execution.
+
+    Besides attribute access (`result.output`) and unpacking (`output, error = result`),
+    the fields can still be read with string keys (`result["output"]`), as when this was a dictionary.
+    """
+
     output: str
     error: str
 
+    @overload
+    def __getitem__(self, key: SupportsIndex) -> str: ...
+
+    @overload
+    def __getitem__(self, key: slice) -> tuple[str, ...]: ...
+
+    @overload
+    def __getitem__(self, key: str) -> str: ...
+
+    def __getitem__(
+        self, key: Union[SupportsIndex, slice, str]
+    ) -> Union[str, tuple[str, ...]]:
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return cast(str, getattr(self, key))
+        return tuple.__getitem__(self, key)
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """
+    Represents the resources a sandbox container is allowed to use.
+
+    Attributes:
+        cpus (float): Number of CPUs allocated to the container. Defaults to 1.
+        memory (int): Memory limit in megabytes. Defaults to 512.
+        processes (int): Maximum number of processes allowed in the container. Defaults to 100.
+        read_rate (str): Maximum device read rate (e.g., "10mb"). Defaults to "10mb".
+        write_rate (str): Maximum device write rate (e.g., "10mb"). Defaults to "10mb".
+
+    Methods:
+        to_flags() -> str:
+            Generates the corresponding `docker run` flags.
+            The string is rendered once and cached on the instance.
+    """
+
+    cpus: float = 1
+    memory: int = 512
+    processes: int = 100
+    read_rate: str = "10mb"
+    write_rate: str = "10mb"
+
+    def __post_init__(self) -> None:
+        if self.cpus <= 0 or self.memory <= 0 or self.processes <= 0:
+            raise ValueError(
+                "The CPUs, memory and processes limits must be greater than 0"
+            )
+
+    @cached_property
+    def _flags(self) -> str:
+        return f"--pids-limit {self.processes} --cpus {self.cpus} -m {self.memory}m --device-read-bps=/dev/sda:{self.read_rate} --device-write-bps=/dev/sda:{self.write_rate}"
+
+    def to_flags(self) -> str:
+        return self._flags
+
 
-__all__ = ["PyprojectDependency", "ExecCommandResponse", "CodeOutput"]
+__all__ = ["PyprojectDependency", "ExecCommandResponse", "CodeOutput", "ResourceLimits"]
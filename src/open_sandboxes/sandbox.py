@@ -1,9 +1,35 @@
+import asyncio
+import os
+import re
+import shlex
+import stat
+import string
+import uuid
+
+from functools import lru_cache
 from pathlib import Path
 from open_sandboxes.uv_config import PyprojectConfig
 from open_sandboxes.ssh_connection import SSHConnection
-from open_sandboxes.models import CodeOutput
+from open_sandboxes.ssh_connection.backends import OutputCallback
+from open_sandboxes.models import CodeOutput, ResourceLimits
 from typing import Optional, Any
 
+_IMAGE = "ghcr.io/astral-sh/uv:alpine"
+# the (host, port) pairs that already have the image pulled and extracted
+_WARMED_UP: set[tuple[str, int]] = set()
+
+_CMD_TEMPLATE = string.Template(
+    "$launcher /bin/sh <<'$command_eof'\n"
+    "${exports_line}"
+    "${pyproject_heredoc}"
+    "cat > $script <<'$eof'\n"
+    "$code\n"
+    "$eof\n"
+    "uv run $script </dev/null\n"
+    "${cleanup}"
+    "${command_eof}\n"
+)
+
 
 class Sandbox:
     def __init__(
@@ -12,6 +38,7 @@ class Sandbox:
         remote_connection: SSHConnection,
         config: Optional[PyprojectConfig] = None,
         pyproject_file_path: Optional[str] = None,
+        default_limits: Optional[ResourceLimits] = None,
     ) -> None:
         """
         Initialize a Sandbox instance.
@@ -23,6 +50,8 @@ class Sandbox:
                 Provide either this or `pyproject_file_path`, not both.
             pyproject_file_path (Optional[str]): The file path to the pyproject configuration file.
                 Provide either this or `config`, not both.
+            default_limits (Optional[ResourceLimits]): The resource limits applied when a call does not override them.
+                Defaults to `ResourceLimits()`.
 
         Raises:
             ValueError: If neither or both `config` and `pyproject_file_path` are provided.
@@ -39,17 +68,37 @@ class Sandbox:
         elif config is not None and pyproject_file_path is None:
             self.pyproject = config.to_str()
         elif config is None and pyproject_file_path is not None:
-            if (
-                not Path(pyproject_file_path).exists()
-                or not Path(pyproject_file_path).is_file()
-            ):
+            path = os.path.abspath(pyproject_file_path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if st is None or not stat.S_ISREG(st.st_mode):
                 raise ValueError(
                     "The provided path either does not exist or is not a file"
                 )
-            with open(pyproject_file_path, "r") as f:
-                self.pyproject = f.read()
+            self.pyproject = _read_pyproject(path, st.st_mtime_ns)
         self.name = name
         self.remote_connection = remote_connection
+        tag = uuid.uuid4().hex
+        self._command_eof = f"__SANDBOX_CMD_{tag}__"
+        self._eof = f"__SANDBOX_EOF_{tag}__"
+        self._pyproject_heredoc = "".join(
+            [
+                f"mkdir -p /tmp/{name} && cd /tmp/{name}\n",
+                f"cat > pyproject.toml <<'{self._eof}'\n",
+                self.pyproject,
+                f"\n{self._eof}\n",
+            ]
+        )
+        # a started container gets its pyproject once, so that concurrent calls never rewrite it while another one reads it
+        self._workdir_line = f"cd /tmp/{name}\n"
+        self.default_limits = default_limits or ResourceLimits()
+        self._default_limits_flags = self.default_limits.to_flags()
+        self._container_name = f"sandbox-{name}"
+        self._started = False
+        self._started_limits = self.default_limits
+        self._applied_limits = self.default_limits
 
     @classmethod
     def from_connection_args(
@@ -63,6 +112,8 @@ class Sandbox:
         key_file: Optional[str] = None,
         config: Optional[PyprojectConfig] = None,
         pyproject_file_path: Optional[str] = None,
+        default_limits: Optional[ResourceLimits] = None,
+        warmup: bool = False,
     ) -> "Sandbox":
         """
         Create a Sandbox instance from SSH connection arguments.
@@ -77,6 +128,8 @@ class Sandbox:
             key_file (Optional[str]): Path to the SSH private key file. Defaults to None.
             config (Optional[PyprojectConfig]): Optional configuration object. Defaults to None.
             pyproject_file_path (Optional[str]): Path to the pyproject file. Defaults to None.
+            default_limits (Optional[ResourceLimits]): The resource limits applied when a call does not override them. Defaults to None.
+            warmup (bool): Whether to call `warmup` on the new sandbox, so that the first run does not pay for pulling the image. Defaults to False.
 
         Returns:
             Sandbox: An instance of the Sandbox class initialized with the provided connection arguments.
@@ -89,19 +142,218 @@ class Sandbox:
             passphrase=passphrase,
             key_file=key_file,
         )
-        return cls(
+        sandbox = cls(
             name=name,
             remote_connection=conn,
             config=config,
             pyproject_file_path=pyproject_file_path,
+            default_limits=default_limits,
+        )
+        if warmup:
+            sandbox.warmup()
+        return sandbox
+
+    def warmup(self) -> None:
+        """
+        Pulls the sandbox image on the remote host and runs it once, so that its layers are downloaded and extracted before the first `run_code`.
+
+        This is done at most once per host in the current process: later calls, from this or other sandboxes on the same host, return immediately.
+
+        Raises:
+            RuntimeError: If the image could not be pulled or run.
+        """
+        host = (self.remote_connection.host, self.remote_connection.port)
+        if host in _WARMED_UP:
+            return
+        result = self.remote_connection.execute_command(
+            f"docker pull -q {_IMAGE} && docker run --rm {_IMAGE} true && echo ready"
+        )
+        if "ready" not in result["stdout"]:
+            raise RuntimeError(f"Unable to pull the sandbox image: {result['stderr']}")
+        _WARMED_UP.add(host)
+
+    def _get_limits(
+        self,
+        cpus: Optional[float] = None,
+        memory: Optional[int] = None,
+        processes: Optional[int] = None,
+        read_rate: Optional[str] = None,
+        write_rate: Optional[str] = None,
+        base: Optional[ResourceLimits] = None,
+    ) -> ResourceLimits:
+        base = base or self.default_limits
+        if not (cpus or memory or processes or read_rate or write_rate):
+            return base
+        return ResourceLimits(
+            cpus=cpus or base.cpus,
+            memory=memory or base.memory,
+            processes=processes or base.processes,
+            read_rate=read_rate or base.read_rate,
+            write_rate=write_rate or base.write_rate,
         )
 
+    def _get_limits_flags(
+        self,
+        cpus: Optional[float] = None,
+        memory: Optional[int] = None,
+        processes: Optional[int] = None,
+        read_rate: Optional[str] = None,
+        write_rate: Optional[str] = None,
+    ) -> str:
+        if not (cpus or memory or processes or read_rate or write_rate):
+            return self._default_limits_flags
+        return self._get_limits(
+            cpus=cpus,
+            memory=memory,
+            processes=processes,
+            read_rate=read_rate,
+            write_rate=write_rate,
+        ).to_flags()
+
+    def _get_launcher(
+        self,
+        cpus: Optional[float] = None,
+        memory: Optional[int] = None,
+        processes: Optional[int] = None,
+        read_rate: Optional[str] = None,
+        write_rate: Optional[str] = None,
+    ) -> tuple[str, Optional[ResourceLimits]]:
+        # also returns the limits set by `docker update`, to be recorded once the command has run
+        if not self._started:
+            limits = self._get_limits_flags(
+                cpus=cpus,
+                memory=memory,
+                processes=processes,
+                read_rate=read_rate,
+                write_rate=write_rate,
+            )
+            return f"docker run -i {limits} --rm {_IMAGE}", None
+        requested = self._get_limits(
+            cpus=cpus,
+            memory=memory,
+            processes=processes,
+            read_rate=read_rate,
+            write_rate=write_rate,
+            base=self._started_limits,
+        )
+        if (
+            requested.read_rate != self._started_limits.read_rate
+            or requested.write_rate != self._started_limits.write_rate
+        ):
+            raise ValueError(
+                "The read and write rates of a started sandbox cannot be changed, stop it first"
+            )
+        launcher = f"docker exec -i {self._container_name}"
+        if requested == self._applied_limits:
+            return launcher, None
+        return (
+            f"docker update --pids-limit {requested.processes} --cpus {requested.cpus} --memory {requested.memory}m --memory-swap {2 * requested.memory}m {self._container_name} >/dev/null && {launcher}",
+            requested,
+        )
+
+    def start(
+        self,
+        cpus: Optional[float] = None,
+        memory: Optional[int] = None,
+        processes: Optional[int] = None,
+        read_rate: Optional[str] = None,
+        write_rate: Optional[str] = None,
+    ) -> None:
+        """
+        Starts a long-lived container for the sandbox on the remote host.
+
+        Until `stop` is called, `run_code` and `run_code_batch` execute the code in this container with `docker exec` instead of creating a new container for each call,
+        and the project environment is kept between calls. The pyproject file is written once, when the container starts.
+
+        Args:
+            cpus (Optional[float]): Number of CPUs to allocate to the container. Defaults to `default_limits.cpus` if not specified.
+            memory (Optional[int]): Memory limit in megabytes for the container. Defaults to `default_limits.memory` if not specified.
+            processes (Optional[int]): Maximum number of processes allowed in the container. Defaults to `default_limits.processes` if not specified.
+            read_rate (Optional[str]): Maximum device read rate (e.g., "10mb"). Defaults to `default_limits.read_rate` if not specified.
+            write_rate (Optional[str]): Maximum device write rate (e.g., "10mb"). Defaults to `default_limits.write_rate` if not specified.
+
+        Raises:
+            RuntimeError: If the container could not be started.
+        """
+        if self._started:
+            return
+        limits = self._get_limits(
+            cpus=cpus,
+            memory=memory,
+            processes=processes,
+            read_rate=read_rate,
+            write_rate=write_rate,
+        )
+        result = self.remote_connection.execute_command(
+            "".join(
+                [
+                    f"docker run -d {limits.to_flags()} --name {self._container_name} {_IMAGE} tail -f /dev/null >/dev/null && ",
+                    f"docker exec -i {self._container_name} /bin/sh <<'{self._command_eof}'\n",
+                    self._pyproject_heredoc,
+                    "echo started\n",
+                    f"{self._command_eof}\n",
+                ]
+            )
+        )
+        if "started" not in result["stdout"]:
+            raise RuntimeError(
+                f"Unable to start the sandbox container: {result['stderr']}"
+            )
+        self._started_limits = limits
+        self._applied_limits = limits
+        self._started = True
+
+    def stop(self) -> None:
+        """
+        Removes the long-lived container started with `start`, if any.
+        """
+        if not self._started:
+            return
+        self.remote_connection.execute_command(f"docker rm -f {self._container_name}")
+        self._started = False
+
     def _get_env_exports(self, environment: dict[str, Any]) -> str:
-        exports = []
-        for k, v in environment.items():
-            escaped_value = str(v).replace("'", "'\\''")
-            exports.append(f'export {k}="{escaped_value}"')
-        return " && ".join(exports)
+        return _cached_env_exports(
+            tuple(sorted((k, str(v)) for k, v in environment.items()))
+        )
+
+    def _get_command(
+        self,
+        code: str,
+        environment: Optional[dict[str, Any]] = None,
+        cpus: Optional[float] = None,
+        memory: Optional[int] = None,
+        processes: Optional[int] = None,
+        read_rate: Optional[str] = None,
+        write_rate: Optional[str] = None,
+    ) -> tuple[str, Optional[ResourceLimits]]:
+        launcher, limits = self._get_launcher(
+            cpus=cpus,
+            memory=memory,
+            processes=processes,
+            read_rate=read_rate,
+            write_rate=write_rate,
+        )
+        if self._started:
+            script = f"script_{uuid.uuid4().hex}.py"
+            cleanup = f"rm -f {script}\n"
+        else:
+            script = "script.py"
+            cleanup = ""
+        exports_line = f"{self._get_env_exports(environment)}\n" if environment else ""
+        command = _CMD_TEMPLATE.substitute(
+            launcher=launcher,
+            command_eof=self._command_eof,
+            exports_line=exports_line,
+            pyproject_heredoc=self._workdir_line
+            if self._started
+            else self._pyproject_heredoc,
+            script=script,
+            eof=self._eof,
+            code=code,
+            cleanup=cleanup,
+        )
+        return command, limits
 
     def run_code(
         self,
@@ -113,6 +365,8 @@ class Sandbox:
         processes: Optional[int] = None,
         read_rate: Optional[str] = None,
         write_rate: Optional[str] = None,
+        on_output: Optional[OutputCallback] = None,
+        on_error: Optional[OutputCallback] = None,
     ) -> CodeOutput:
         """
         Executes the provided Python code in a remote Docker sandbox with configurable resource limits.
@@ -121,57 +375,222 @@ class Sandbox:
             code (str): The Python code to execute.
             timeout (Optional[float]): Maximum time in seconds to allow for execution. Defaults to None.
             environment (Optional[dict[str, Any]]): Environment variables to set inside the container. Defaults to None.
-            cpus (Optional[float]): Number of CPUs to allocate to the container. Defaults to 1 if not specified.
-            memory (Optional[int]): Memory limit in megabytes for the container. Defaults to 512 MB if not specified.
-            processes (Optional[int]): Maximum number of processes allowed in the container. Defaults to 100 if not specified.
-            read_rate (Optional[str]): Maximum device read rate (e.g., "10mb"). Defaults to "10mb" if not specified.
-            write_rate (Optional[str]): Maximum device write rate (e.g., "10mb"). Defaults to "10mb" if not specified.
+            cpus (Optional[float]): Number of CPUs to allocate to the container. Defaults to `default_limits.cpus` if not specified.
+            memory (Optional[int]): Memory limit in megabytes for the container. Defaults to `default_limits.memory` if not specified.
+            processes (Optional[int]): Maximum number of processes allowed in the container. Defaults to `default_limits.processes` if not specified.
+            read_rate (Optional[str]): Maximum device read rate (e.g., "10mb"). Defaults to `default_limits.read_rate` if not specified.
+            write_rate (Optional[str]): Maximum device write rate (e.g., "10mb"). Defaults to `default_limits.write_rate` if not specified.
+            on_output (Optional[Callable[[bytes], None]]): Called with each chunk of standard output while the code runs.
+                Streamed chunks are not kept in the returned 'output'. Defaults to None.
+            on_error (Optional[Callable[[bytes], None]]): Called with each chunk of standard error while the code runs.
+                Streamed chunks are not kept in the returned 'error'. Defaults to None.
 
         Returns:
-            CodeOutput: A dictionary containing the standard output and error output from the code execution.
+            CodeOutput: A named tuple containing the standard output and error output from the code execution.
 
             ```
-            {
-                "output": str,  # Standard output from the executed code
-                "error": str    # Standard error from the executed code
-            }
+            CodeOutput(
+                output=str,  # Standard output from the executed code
+                error=str,   # Standard error from the executed code
+            )
             ```
         """
-        cpu_limit = cpus or 1
-        memory_limit = memory or 512
-        processes_limit = processes or 100
-        read_rate_limit = read_rate or "10mb"
-        write_rate_limit = write_rate or "10mb"
-        pyproject_escaped = self.pyproject.replace("'", "'\\''")
-        code_escaped = code.replace("'", "'\\''")
-        if environment:
-            exports = self._get_env_exports(environment)
-            command = f"""docker run --pids-limit {processes_limit} --cpus {cpu_limit} -m {memory_limit}m --device-read-bps=/dev/sda:{read_rate_limit} --device-write-bps=/dev/sda:{write_rate_limit} --rm ghcr.io/astral-sh/uv:alpine /bin/sh -c '
-{exports} && \
-mkdir -p /tmp/{self.name} && \
-cat > /tmp/{self.name}/pyproject.toml << "EOF"
-{pyproject_escaped}
-EOF
-cat > /tmp/{self.name}/script.py << "EOF"
-{code_escaped}
-EOF
-cd /tmp/{self.name}/ && \
-uv run script.py
-'"""
-        else:
-            command = f"""docker run --pids-limit {processes_limit} --cpus {cpu_limit} -m {memory_limit}m --device-read-bps=/dev/sda:{read_rate_limit} --device-write-bps=/dev/sda:{write_rate_limit} --rm ghcr.io/astral-sh/uv:alpine /bin/sh -c '
-mkdir -p /tmp/{self.name} && \
-cat > /tmp/{self.name}/pyproject.toml << "EOF"
-{pyproject_escaped}
-EOF
-cat > /tmp/{self.name}/script.py << "EOF"
-{code_escaped}
-EOF
-cd /tmp/{self.name}/ && \
-uv run script.py
-'"""
-        print("COMMAND", command)
-        print()
-        print()
+        command, limits = self._get_command(
+            code,
+            environment=environment,
+            cpus=cpus,
+            memory=memory,
+            processes=processes,
+            read_rate=read_rate,
+            write_rate=write_rate,
+        )
+        result = self.remote_connection.execute_command(
+            command, timeout=timeout, on_stdout=on_output, on_stderr=on_error
+        )
+        if limits is not None:
+            self._applied_limits = limits
+        return CodeOutput(result["stdout"], result["stderr"])
+
+    async def arun_code(
+        self,
+        code: str,
+        timeout: Optional[float] = None,
+        environment: Optional[dict[str, Any]] = None,
+        cpus: Optional[float] = None,
+        memory: Optional[int] = None,
+        processes: Optional[int] = None,
+        read_rate: Optional[str] = None,
+        write_rate: Optional[str] = None,
+    ) -> CodeOutput:
+        """
+        Asynchronous version of `run_code`, which does not block the event loop while the code runs.
+
+        With an `AsyncSSHConnection`, concurrent calls run as channels multiplexed over one SSH connection.
+
+        Args:
+            code (str): The Python code to execute.
+            timeout (Optional[float]): Maximum time in seconds to allow for execution. Defaults to None.
+            environment (Optional[dict[str, Any]]): Environment variables to set inside the container. Defaults to None.
+            cpus (Optional[float]): Number of CPUs to allocate to the container. Defaults to `default_limits.cpus` if not specified.
+            memory (Optional[int]): Memory limit in megabytes for the container. Defaults to `default_limits.memory` if not specified.
+            processes (Optional[int]): Maximum number of processes allowed in the container. Defaults to `default_limits.processes` if not specified.
+            read_rate (Optional[str]): Maximum device read rate (e.g., "10mb"). Defaults to `default_limits.read_rate` if not specified.
+            write_rate (Optional[str]): Maximum device write rate (e.g., "10mb"). Defaults to `default_limits.write_rate` if not specified.
+
+        Returns:
+            CodeOutput: A named tuple containing the standard output and error output from the code execution.
+        """
+        command, limits = self._get_command(
+            code,
+            environment=environment,
+            cpus=cpus,
+            memory=memory,
+            processes=processes,
+            read_rate=read_rate,
+            write_rate=write_rate,
+        )
+        result = await self.remote_connection.aexecute_command(command, timeout=timeout)
+        if limits is not None:
+            self._applied_limits = limits
+        return CodeOutput(result["stdout"], result["stderr"])
+
+    async def arun_code_batch(
+        self,
+        codes: list[str],
+        max_concurrency: int = 10,
+        timeout: Optional[float] = None,
+        environment: Optional[dict[str, Any]] = None,
+        cpus: Optional[float] = None,
+        memory: Optional[int] = None,
+        processes: Optional[int] = None,
+        read_rate: Optional[str] = None,
+        write_rate: Optional[str] = None,
+    ) -> list[CodeOutput]:
+        """
+        Executes several Python scripts concurrently, each one with its own `arun_code` call.
+
+        Unlike `run_code_batch`, the scripts do not wait for each other: up to `max_concurrency` of them run at the same time.
+
+        Args:
+            codes (list[str]): The Python scripts to execute.
+            max_concurrency (int): The maximum number of scripts running at the same time. Defaults to 10.
+            timeout (Optional[float]): Maximum time in seconds to allow for the execution of each script. Defaults to None.
+            environment (Optional[dict[str, Any]]): Environment variables to set inside the container. Defaults to None.
+            cpus (Optional[float]): Number of CPUs to allocate to the container. Defaults to `default_limits.cpus` if not specified.
+            memory (Optional[int]): Memory limit in megabytes for the container. Defaults to `default_limits.memory` if not specified.
+            processes (Optional[int]): Maximum number of processes allowed in the container. Defaults to `default_limits.processes` if not specified.
+            read_rate (Optional[str]): Maximum device read rate (e.g., "10mb"). Defaults to `default_limits.read_rate` if not specified.
+            write_rate (Optional[str]): Maximum device write rate (e.g., "10mb"). Defaults to `default_limits.write_rate` if not specified.
+
+        Returns:
+            list[CodeOutput]: The standard output and error output of each script, in the same order as `codes`.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(code: str) -> CodeOutput:
+            async with semaphore:
+                return await self.arun_code(
+                    code,
+                    timeout=timeout,
+                    environment=environment,
+                    cpus=cpus,
+                    memory=memory,
+                    processes=processes,
+                    read_rate=read_rate,
+                    write_rate=write_rate,
+                )
+
+        return list(await asyncio.gather(*(run(code) for code in codes)))
+
+    def run_code_batch(
+        self,
+        codes: list[str],
+        timeout: Optional[float] = None,
+        environment: Optional[dict[str, Any]] = None,
+        cpus: Optional[float] = None,
+        memory: Optional[int] = None,
+        processes: Optional[int] = None,
+        read_rate: Optional[str] = None,
+        write_rate: Optional[str] = None,
+    ) -> list[CodeOutput]:
+        """
+        Executes several Python scripts one after the other in the same remote Docker sandbox, with a single SSH command.
+
+        The scripts share one container and one project environment, so the image is started and the dependencies are installed only once.
+
+        Args:
+            codes (list[str]): The Python scripts to execute, in order.
+            timeout (Optional[float]): Maximum time in seconds to allow for the execution of the whole batch. Defaults to None.
+            environment (Optional[dict[str, Any]]): Environment variables to set inside the container. Defaults to None.
+            cpus (Optional[float]): Number of CPUs to allocate to the container. Defaults to `default_limits.cpus` if not specified.
+            memory (Optional[int]): Memory limit in megabytes for the container. Defaults to `default_limits.memory` if not specified.
+            processes (Optional[int]): Maximum number of processes allowed in the container. Defaults to `default_limits.processes` if not specified.
+            read_rate (Optional[str]): Maximum device read rate (e.g., "10mb"). Defaults to `default_limits.read_rate` if not specified.
+            write_rate (Optional[str]): Maximum device write rate (e.g., "10mb"). Defaults to `default_limits.write_rate` if not specified.
+
+        Returns:
+            list[CodeOutput]: The standard output and error output of each script, in the same order as `codes`.
+        """
+        if not codes:
+            return []
+        launcher, limits = self._get_launcher(
+            cpus=cpus,
+            memory=memory,
+            processes=processes,
+            read_rate=read_rate,
+            write_rate=write_rate,
+        )
+        tag = uuid.uuid4().hex
+        prefix = f"script_{tag}_" if self._started else "script_"
+        exports = f"{self._get_env_exports(environment)}\n" if environment else ""
+        scripts = "".join(
+            f"cat > {prefix}{i}.py <<'{self._eof}'\n{code}\n{self._eof}\n"
+            for i, code in enumerate(codes)
+        )
+        command = "".join(
+            [
+                f"{launcher} /bin/sh <<'{self._command_eof}'\n",
+                exports,
+                self._workdir_line if self._started else self._pyproject_heredoc,
+                scripts,
+                f"for i in $(seq 0 {len(codes) - 1}); do\n",
+                f'echo "__OS_BEGIN_{tag}_${{i}}__" && echo "__OS_BEGIN_{tag}_${{i}}__" >&2\n',
+                f"uv run {prefix}${{i}}.py </dev/null\n",
+                f'echo "__OS_END_{tag}_${{i}}__" && echo "__OS_END_{tag}_${{i}}__" >&2\n',
+                "done\n",
+                f"rm -f {prefix}*.py\n" if self._started else "",
+                f"{self._command_eof}\n",
+            ]
+        )
         result = self.remote_connection.execute_command(command, timeout=timeout)
-        return {"output": result["stdout"], "error": result["stderr"]}
+        if limits is not None:
+            self._applied_limits = limits
+        outputs = _split_batch_output(result["stdout"], tag, len(codes))
+        errors = _split_batch_output(result["stderr"], tag, len(codes))
+        return [CodeOutput(output, error) for output, error in zip(outputs, errors)]
+
+
+@lru_cache(maxsize=64)
+def _cached_env_exports(items: tuple[tuple[str, str], ...]) -> str:
+    return " && ".join(f"export {k}={shlex.quote(v)}" for k, v in items)
+
+
+@lru_cache(maxsize=128)
+def _read_pyproject(path: str, mtime_ns: int) -> str:
+    # the modification time is part of the cache key, so that edited files are read again
+    return Path(path).read_text(encoding="utf-8")
+
+
+def _split_batch_output(stream: str, tag: str, count: int) -> list[str]:
+    pattern = re.compile(
+        rf"__OS_BEGIN_{tag}_(\d+)__\n(.*?)(?:__OS_END_{tag}_\1__\n|\Z)", re.DOTALL
+    )
+    first = pattern.search(stream)
+    # anything printed before the first script (e.g. docker failing to start) concerns the whole batch
+    preamble = stream if first is None else stream[: first.start()]
+    sections = [preamble] * count
+    for match in pattern.finditer(stream):
+        index = int(match.group(1))
+        if index < count:
+            sections[index] = preamble + match.group(2)
+    return sections
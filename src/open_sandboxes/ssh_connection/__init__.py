@@ -1,3 +1,11 @@
 from .base import SSHConnection
+from .async_base import AsyncSSHConnection
+from .backends import SSHBackend, ParamikoBackend, Ssh2Backend
 
-__all__ = ["SSHConnection"]
+__all__ = [
+    "SSHConnection",
+    "AsyncSSHConnection",
+    "SSHBackend",
+    "ParamikoBackend",
+    "Ssh2Backend",
+]
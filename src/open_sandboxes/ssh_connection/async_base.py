@@ -0,0 +1,150 @@
+import asyncio
+
+from typing import Optional, cast
+from open_sandboxes.models import ExecCommandResponse
+from open_sandboxes.ssh_connection.base import SSHConnection
+
+try:
+    import asyncssh
+except ImportError:
+    asyncssh = None  # type: ignore[assignment]
+
+
+class AsyncSSHConnection(SSHConnection):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: Optional[str] = None,
+        passphrase: Optional[str] = None,
+        key_file: Optional[str] = None,
+        max_connections: int = 10,
+        keepalive_interval: int = 30,
+        compression: bool = True,
+        tcp_nodelay: bool = True,
+        backend: Optional[str] = None,
+        max_sessions: int = 10,
+    ) -> None:
+        """
+        Initialize a remote SSH connection that executes commands natively on asyncio.
+
+        All the commands awaited through `aexecute_command` run as channels multiplexed over one single `asyncssh` connection,
+        while `execute_command` keeps working synchronously as in `SSHConnection`.
+
+        Args:
+            host (str): The hostname or IP address of the SSH server.
+            port (int): The port number to connect to on the SSH server.
+            username (str): The username to authenticate as.
+            password (Optional[str]): The password for authentication. Required if passphrase is not provided.
+            passphrase (Optional[str]): The passphrase for the private key file. Required if password is not provided.
+            key_file (Optional[str]): The path to the private key file. Required if passphrase is provided.
+            max_connections (int): The maximum number of SSH connections open at the same time by `execute_command` to this host and user.
+                Defaults to 10.
+            keepalive_interval (int): Seconds between SSH keepalive packets, 0 to disable. Defaults to 30.
+            compression (bool): Whether to negotiate zlib compression of the SSH transport. Defaults to True.
+            tcp_nodelay (bool): Whether to disable Nagle's algorithm on the TCP socket of `execute_command`. Defaults to True.
+                asyncio already disables it on the socket used by `aexecute_command`.
+            backend (Optional[str]): The library used by the synchronous `execute_command`, either "ssh2" or "paramiko".
+                Defaults to None, which selects "ssh2" if it is installed and "paramiko" otherwise.
+            max_sessions (int): The maximum number of commands running at the same time on the asyncio connection.
+                Keep it at or below the `MaxSessions` setting of the SSH server. Defaults to 10.
+
+        Raises:
+            ImportError: If `asyncssh` is not installed.
+            ValueError: If neither password nor passphrase is provided.
+            ValueError: If passphrase is provided without a key_file.
+        """
+        if asyncssh is None:
+            raise ImportError(
+                "AsyncSSHConnection requires asyncssh: install it with `pip install open-sandboxes[async]`"
+            )
+        super().__init__(
+            host=host,
+            port=port,
+            username=username,
+            password=password,
+            passphrase=passphrase,
+            key_file=key_file,
+            max_connections=max_connections,
+            keepalive_interval=keepalive_interval,
+            compression=compression,
+            tcp_nodelay=tcp_nodelay,
+            backend=backend,
+        )
+        self.max_sessions = max_sessions
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._aconnection: Optional["asyncssh.SSHClientConnection"] = None
+        self._aconnect_lock = asyncio.Lock()
+        self._asessions = asyncio.Semaphore(max_sessions)
+
+    async def _aconnect(self) -> "asyncssh.SSHClientConnection":
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # asyncio objects are bound to the loop they are first used in
+            self._loop = loop
+            self._aconnection = None
+            self._aconnect_lock = asyncio.Lock()
+            self._asessions = asyncio.Semaphore(self.max_sessions)
+        async with self._aconnect_lock:
+            if self._aconnection is None or self._aconnection.is_closed():
+                if self._is_passphrase:
+                    self._aconnection = await asyncssh.connect(
+                        self.host,
+                        port=self.port,
+                        username=self.username,
+                        client_keys=[cast(str, self.key_file)],
+                        passphrase=self.password,
+                        known_hosts=None,
+                        keepalive_interval=self.keepalive_interval,
+                        compression_algs=self._compression_algs(),
+                    )
+                else:
+                    self._aconnection = await asyncssh.connect(
+                        self.host,
+                        port=self.port,
+                        username=self.username,
+                        password=self.password,
+                        known_hosts=None,
+                        keepalive_interval=self.keepalive_interval,
+                        compression_algs=self._compression_algs(),
+                    )
+            self._is_connected = True
+            return self._aconnection
+
+    def _compression_algs(self) -> list[str]:
+        if self.compression:
+            return ["zlib@openssh.com", "zlib", "none"]
+        return ["none"]
+
+    async def aexecute_command(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+    ) -> ExecCommandResponse:
+        """
+        Executes a command on the remote SSH server without blocking the event loop.
+
+        Args:
+            command (str): The command to execute on the remote server.
+            timeout (Optional[float], optional): The maximum time in seconds to wait for command execution. Defaults to None.
+
+        Returns:
+            ExecCommandResponse: A dictionary containing 'stdout' and 'stderr' output from the executed command.
+
+        Raises:
+            Any exceptions raised by `asyncssh` during connection or command execution.
+        """
+        connection = await self._aconnect()
+        async with self._asessions:
+            result = await connection.run(command, timeout=timeout)
+        return {
+            "stdout": cast(str, result.stdout or ""),
+            "stderr": cast(str, result.stderr or ""),
+        }
+
+    async def _aclose(self) -> None:
+        if self._aconnection is not None:
+            self._aconnection.close()
+            await self._aconnection.wait_closed()
+            self._aconnection = None
@@ -0,0 +1,472 @@
+import select
+import shlex
+import socket
+import time
+import uuid
+
+import paramiko
+
+from typing import Any, Callable, Optional, Protocol
+from open_sandboxes.models import ExecCommandResponse
+
+try:
+    from ssh2.error_codes import LIBSSH2_ERROR_EAGAIN
+    from ssh2.exceptions import SSH2Error, Timeout
+    from ssh2.session import (
+        LIBSSH2_FLAG_COMPRESS,
+        LIBSSH2_SESSION_BLOCK_INBOUND,
+        LIBSSH2_SESSION_BLOCK_OUTBOUND,
+        Session,
+    )
+except ImportError:
+    Session = None
+
+_HEREDOC = "<<"
+_RECV_SIZE = 65536
+# seconds allowed for the SSH banner exchange and the authentication, the same defaults as paramiko
+_BANNER_TIMEOUT = 15
+_AUTH_TIMEOUT = 30
+
+OutputCallback = Callable[[bytes], None]
+
+
+class StaleConnectionError(ConnectionError):
+    """
+    Raised by a backend when a command could not even be sent, because the underlying SSH connection is broken.
+
+    The command is guaranteed not to have run, so it is safe to retry it on a new connection.
+    """
+
+
+class SSHBackend(Protocol):
+    """
+    An authenticated SSH session that `SSHConnection` borrows from the pool to execute commands.
+    """
+
+    @classmethod
+    def connect(
+        cls,
+        host: str,
+        port: int,
+        username: str,
+        password: Optional[str] = None,
+        key_file: Optional[str] = None,
+        passphrase: Optional[str] = None,
+        compression: bool = True,
+        keepalive_interval: int = 30,
+        tcp_nodelay: bool = True,
+    ) -> "SSHBackend": ...
+
+    def is_alive(self) -> bool: ...
+
+    def execute(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+        on_stdout: Optional[OutputCallback] = None,
+        on_stderr: Optional[OutputCallback] = None,
+    ) -> ExecCommandResponse: ...
+
+    def close(self) -> None: ...
+
+
+def _tune_socket(sock: socket.socket, tcp_nodelay: bool) -> None:
+    # TCP keepalives stop NAT gateways and firewalls from silently dropping idle pooled connections
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if tcp_nodelay:
+        # commands are small packets: without this, Nagle's algorithm holds them back until the previous one is ACKed
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    remaining = None if deadline is None else deadline - time.monotonic()
+    if remaining is not None and remaining <= 0:
+        raise socket.timeout("Timed out waiting for the command to complete")
+    return remaining
+
+
+def _wait_readable(channel: paramiko.Channel, deadline: Optional[float]) -> None:
+    # stdout and stderr share the channel's file descriptor, so one select() waits for either of them
+    select.select([channel], [], [], _remaining(deadline))
+
+
+def _is_drained(channel: paramiko.Channel) -> bool:
+    return (
+        channel.exit_status_ready()
+        and not channel.recv_ready()
+        and not channel.recv_stderr_ready()
+    )
+
+
+class ParamikoBackend:
+    def __init__(self, client: paramiko.SSHClient) -> None:
+        """
+        Wrap a connected paramiko client.
+
+        Commands are sent to a long-lived shell kept open on the client, so that they don't pay for opening a new channel each time.
+        Commands containing a heredoc or streaming their output run on a dedicated exec channel instead.
+
+        Args:
+            client (paramiko.SSHClient): The connected client.
+        """
+        self.client = client
+        self._shell: Optional[paramiko.Channel] = None
+
+    @classmethod
+    def connect(
+        cls,
+        host: str,
+        port: int,
+        username: str,
+        password: Optional[str] = None,
+        key_file: Optional[str] = None,
+        passphrase: Optional[str] = None,
+        compression: bool = True,
+        keepalive_interval: int = 30,
+        tcp_nodelay: bool = True,
+    ) -> "ParamikoBackend":
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        if passphrase is not None:
+            client.connect(
+                hostname=host,
+                port=port,
+                username=username,
+                passphrase=passphrase,
+                key_filename=key_file,
+                compress=compression,
+            )
+        else:
+            client.connect(
+                hostname=host,
+                port=port,
+                username=username,
+                password=password,
+                compress=compression,
+            )
+        transport = client.get_transport()
+        if transport is not None:
+            transport.set_keepalive(keepalive_interval)
+            if isinstance(transport.sock, socket.socket):
+                _tune_socket(transport.sock, tcp_nodelay)
+        return cls(client)
+
+    def is_alive(self) -> bool:
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def _open_shell(self) -> paramiko.Channel:
+        if self._shell is not None and not self._shell.closed:
+            return self._shell
+        transport = self.client.get_transport()
+        if transport is None:
+            raise paramiko.SSHException("SSH session not active")
+        # a plain exec'd shell rather than invoke_shell(): without a pty, stderr stays a separate stream
+        shell = transport.open_session()
+        shell.exec_command("/bin/sh")
+        self._shell = shell
+        return shell
+
+    def _close_shell(self) -> None:
+        if self._shell is not None:
+            self._shell.close()
+            self._shell = None
+
+    def _start(
+        self, command: str, timeout: Optional[float], use_shell: bool
+    ) -> tuple[paramiko.Channel, Optional[bytes]]:
+        if not use_shell:
+            _, stdout, _ = self.client.exec_command(command=command, timeout=timeout)
+            return stdout.channel, None
+        shell = self._open_shell()
+        shell.settimeout(timeout)
+        marker = f"__OS_DONE_{uuid.uuid4().hex}__"
+        # the subshell keeps each command isolated (cwd, variables, syntax errors) from the long-lived shell
+        shell.sendall(
+            f"( eval {shlex.quote(command)} ) </dev/null\n"
+            f"printf '%s\\n' {marker}\n"
+            f"printf '%s\\n' {marker} >&2\n".encode()
+        )
+        return shell, marker.encode()
+
+    def _read_shell(
+        self, shell: paramiko.Channel, marker: bytes, deadline: Optional[float]
+    ) -> ExecCommandResponse:
+        out, err = bytearray(), bytearray()
+        out_end = err_end = -1
+        while out_end < 0 or err_end < 0:
+            _wait_readable(shell, deadline)
+            if shell.recv_ready():
+                # only the tail can hold a new marker, so large outputs are not rescanned on every chunk
+                start = max(len(out) - len(marker), 0)
+                out += shell.recv(_RECV_SIZE)
+                out_end = out.find(marker, start)
+            if shell.recv_stderr_ready():
+                start = max(len(err) - len(marker), 0)
+                err += shell.recv_stderr(_RECV_SIZE)
+                err_end = err.find(marker, start)
+            if _is_drained(shell):
+                self._close_shell()
+                if out_end >= 0:
+                    # the command completed, only the stderr marker was lost
+                    break
+                if not out and not err:
+                    raise StaleConnectionError(
+                        "The shell exited before running the command"
+                    )
+                raise paramiko.SSHException(
+                    "The shell exited before the command completed"
+                )
+        return {
+            "stdout": bytes(out if out_end < 0 else out[:out_end]).decode(),
+            "stderr": bytes(err if err_end < 0 else err[:err_end]).decode(),
+        }
+
+    def _read_channel(
+        self,
+        channel: paramiko.Channel,
+        deadline: Optional[float],
+        on_stdout: Optional[OutputCallback] = None,
+        on_stderr: Optional[OutputCallback] = None,
+    ) -> ExecCommandResponse:
+        out, err = bytearray(), bytearray()
+        while not _is_drained(channel):
+            _wait_readable(channel, deadline)
+            if channel.recv_ready():
+                chunk = channel.recv(_RECV_SIZE)
+                if on_stdout is None:
+                    out += chunk
+                else:
+                    on_stdout(chunk)
+            if channel.recv_stderr_ready():
+                chunk = channel.recv_stderr(_RECV_SIZE)
+                if on_stderr is None:
+                    err += chunk
+                else:
+                    on_stderr(chunk)
+        return {"stdout": bytes(out).decode(), "stderr": bytes(err).decode()}
+
+    def execute(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+        on_stdout: Optional[OutputCallback] = None,
+        on_stderr: Optional[OutputCallback] = None,
+    ) -> ExecCommandResponse:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        use_shell = _HEREDOC not in command and on_stdout is None and on_stderr is None
+        try:
+            channel, marker = self._start(command, timeout, use_shell)
+        except socket.timeout:
+            raise
+        except (paramiko.SSHException, socket.error, EOFError) as e:
+            raise StaleConnectionError(str(e)) from e
+        if marker is not None:
+            return self._read_shell(channel, marker, deadline)
+        return self._read_channel(channel, deadline, on_stdout, on_stderr)
+
+    def close(self) -> None:
+        try:
+            self._close_shell()
+        except (paramiko.SSHException, socket.error, EOFError):
+            # the server already dropped the connection: there is nothing left to close on its side
+            self._shell = None
+        finally:
+            self.client.close()
+
+
+class Ssh2Backend:
+    def __init__(
+        self, sock: socket.socket, session: Any, keepalive_interval: int = 0
+    ) -> None:
+        """
+        Wrap an authenticated `ssh2-python` session, which runs the SSH protocol and its cryptography in libssh2 rather than in Python.
+
+        Every command runs on its own exec channel, read in non-blocking mode.
+
+        Args:
+            sock (socket.socket): The socket the session runs over.
+            session (ssh2.session.Session): The authenticated session.
+            keepalive_interval (int): Seconds between SSH keepalive packets, 0 if keepalives are disabled. Defaults to 0.
+        """
+        self.sock = sock
+        self.session = session
+        self.keepalive_interval = keepalive_interval
+        self._closed = False
+
+    @classmethod
+    def connect(
+        cls,
+        host: str,
+        port: int,
+        username: str,
+        password: Optional[str] = None,
+        key_file: Optional[str] = None,
+        passphrase: Optional[str] = None,
+        compression: bool = True,
+        keepalive_interval: int = 30,
+        tcp_nodelay: bool = True,
+    ) -> "Ssh2Backend":
+        if Session is None:
+            raise ImportError(
+                "The ssh2 backend requires ssh2-python: install it with `pip install open-sandboxes[ssh2]`"
+            )
+        sock = socket.create_connection((host, port), timeout=_BANNER_TIMEOUT)
+        _tune_socket(sock, tcp_nodelay)
+        # libssh2 restores the socket's original blocking mode when the session is freed, possibly after the
+        # descriptor was closed and reused by another connection: starting non-blocking leaves nothing to restore
+        sock.setblocking(False)
+        try:
+            session = Session()
+            session.flag(LIBSSH2_FLAG_COMPRESS, compression)
+            # blocking calls wait on the socket for at most the session timeout, so a silent server cannot hang them
+            session.set_timeout(int(_BANNER_TIMEOUT * 1000))
+            session.handshake(sock)
+            session.set_timeout(int(_AUTH_TIMEOUT * 1000))
+            if passphrase is not None:
+                session.userauth_publickey_fromfile(
+                    username, key_file, passphrase=passphrase
+                )
+            else:
+                session.userauth_password(username, password)
+            session.set_timeout(0)
+            session.keepalive_config(False, keepalive_interval)
+            session.set_blocking(False)
+        except Timeout as e:
+            sock.close()
+            raise socket.timeout(
+                f"Timed out connecting to {host}:{port} over SSH"
+            ) from e
+        except BaseException:
+            sock.close()
+            raise
+        return cls(sock, session, keepalive_interval)
+
+    def is_alive(self) -> bool:
+        if self._closed:
+            return False
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            # a readable socket with nothing to peek at has been closed by the server
+            if readable and self.sock.recv(1, socket.MSG_PEEK) == b"":
+                return False
+            self._send_keepalive()
+            return True
+        except (SSH2Error, OSError):
+            return False
+
+    def _send_keepalive(self) -> Optional[float]:
+        # libssh2 has no background thread: keepalives are only sent when polled, if `keepalive_interval` elapsed since the last one
+        if not self.keepalive_interval:
+            return None
+        next_keepalive = self.session.keepalive_send()
+        return max(next_keepalive, 1) if next_keepalive >= 0 else None
+
+    def _wait(self, deadline: Optional[float]) -> None:
+        timeout = _remaining(deadline)
+        next_keepalive = self._send_keepalive()
+        if next_keepalive is not None:
+            # wake up in time to keep the session alive while a command runs silently
+            timeout = (
+                next_keepalive if timeout is None else min(timeout, next_keepalive)
+            )
+        directions = self.session.block_directions()
+        select.select(
+            [self.sock] if directions & LIBSSH2_SESSION_BLOCK_INBOUND else [],
+            [self.sock] if directions & LIBSSH2_SESSION_BLOCK_OUTBOUND else [],
+            [],
+            timeout,
+        )
+
+    def _call(
+        self, deadline: Optional[float], function: Callable[..., Any], *args: Any
+    ) -> Any:
+        while True:
+            result = function(*args)
+            if not isinstance(result, int) or result != LIBSSH2_ERROR_EAGAIN:
+                return result
+            self._wait(deadline)
+
+    def execute(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+        on_stdout: Optional[OutputCallback] = None,
+        on_stderr: Optional[OutputCallback] = None,
+    ) -> ExecCommandResponse:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            channel = self._call(deadline, self.session.open_session)
+            self._call(deadline, channel.execute, command)
+        except socket.timeout:
+            raise
+        except (SSH2Error, socket.error) as e:
+            raise StaleConnectionError(str(e)) from e
+        out, err = bytearray(), bytearray()
+        while True:
+            size, chunk = channel.read(_RECV_SIZE)
+            if size > 0:
+                if on_stdout is None:
+                    out += chunk
+                else:
+                    on_stdout(chunk)
+            err_size, err_chunk = channel.read_stderr(_RECV_SIZE)
+            if err_size > 0:
+                if on_stderr is None:
+                    err += err_chunk
+                else:
+                    on_stderr(err_chunk)
+            if size > 0 or err_size > 0:
+                continue
+            if channel.eof():
+                break
+            self._wait(deadline)
+        self._call(deadline, channel.close)
+        return {"stdout": bytes(out).decode(), "stderr": bytes(err).decode()}
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.session.set_blocking(True)
+            self.session.disconnect()
+        except (SSH2Error, socket.error):
+            pass
+        finally:
+            # free the session while its socket is still open
+            self.session = None
+            self.sock.close()
+
+
+BACKENDS: dict[str, type[SSHBackend]] = {
+    "ssh2": Ssh2Backend,
+    "paramiko": ParamikoBackend,
+}
+
+
+def get_backend(name: Optional[str] = None) -> type[SSHBackend]:
+    """
+    Resolve the backend class used to open SSH connections.
+
+    Args:
+        name (Optional[str]): One of the keys of `BACKENDS`. Defaults to None, which selects `ssh2` if `ssh2-python` is installed and `paramiko` otherwise.
+
+    Returns:
+        type[SSHBackend]: The backend class.
+
+    Raises:
+        ValueError: If `name` is not a known backend.
+        ImportError: If the requested backend is not installed.
+    """
+    if name is None:
+        return Ssh2Backend if Session is not None else ParamikoBackend
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown SSH backend {name!r}, choose one of: {', '.join(BACKENDS)}"
+        )
+    if name == "ssh2" and Session is None:
+        raise ImportError(
+            "The ssh2 backend requires ssh2-python: install it with `pip install open-sandboxes[ssh2]`"
+        )
+    return BACKENDS[name]
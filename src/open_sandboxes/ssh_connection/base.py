@@ -1,7 +1,16 @@
-import paramiko
+import asyncio
+import hashlib
 
 from typing import Optional, cast
 from open_sandboxes.models import ExecCommandResponse
+from open_sandboxes.ssh_connection import pool
+from open_sandboxes.ssh_connection.backends import (
+    OutputCallback,
+    SSHBackend,
+    StaleConnectionError,
+    get_backend,
+)
+from open_sandboxes.ssh_connection.pool import PoolKey
 
 
 class SSHConnection:
@@ -13,6 +22,11 @@ class SSHConnection:
         password: Optional[str] = None,
         passphrase: Optional[str] = None,
         key_file: Optional[str] = None,
+        max_connections: int = 10,
+        keepalive_interval: int = 30,
+        compression: bool = True,
+        tcp_nodelay: bool = True,
+        backend: Optional[str] = None,
     ) -> None:
         """
         Initialize a remote SSH connection.
@@ -24,10 +38,22 @@ class SSHConnection:
             password (Optional[str]): The password for authentication. Required if passphrase is not provided.
             passphrase (Optional[str]): The passphrase for the private key file. Required if password is not provided.
             key_file (Optional[str]): The path to the private key file. Required if passphrase is provided.
+            max_connections (int): The maximum number of SSH connections open at the same time to this host and user, shared by all
+                the connections with the same settings. Commands wait for a free connection beyond that. Defaults to 10.
+            keepalive_interval (int): Seconds between SSH keepalive packets on pooled clients, 0 to disable. Defaults to 30.
+                The ssh2 backend has no background thread, so it only sends them while a command runs and when a client is borrowed from the pool.
+            compression (bool): Whether to negotiate zlib compression of the SSH transport, which shrinks the scripts and pyproject files sent with each command.
+                Defaults to True.
+            tcp_nodelay (bool): Whether to disable Nagle's algorithm on the TCP socket, so that small command packets are sent without delay.
+                Defaults to True.
+            backend (Optional[str]): The library used to talk SSH, either "ssh2" (libssh2, through `ssh2-python`) or "paramiko".
+                Defaults to None, which selects "ssh2" if it is installed and "paramiko" otherwise.
 
         Raises:
             ValueError: If neither password nor passphrase is provided.
             ValueError: If passphrase is provided without a key_file.
+            ValueError: If the backend is unknown.
+            ImportError: If the requested backend is not installed.
         """
         self.key_file: Optional[str] = None
         self.password: str = ""
@@ -52,36 +78,112 @@ class SSHConnection:
         self.host = host
         self.port = port
         self.username = username
-        self._client = paramiko.SSHClient()
+        self.max_connections = max_connections
+        self.keepalive_interval = keepalive_interval
+        self.compression = compression
+        self.tcp_nodelay = tcp_nodelay
+        self._backend = get_backend(backend)
         self._is_connected = False
 
-    def _connect(self) -> None:
-        self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    def _key(self) -> PoolKey:
         if self._is_passphrase:
-            self._client.connect(
-                hostname=self.host,
-                port=self.port,
-                username=self.username,
-                passphrase=self.password,
-                key_filename=self.key_file,
-            )
+            secret = cast(str, self.key_file)
         else:
-            self._client.connect(
-                hostname=self.host,
-                port=self.port,
-                username=self.username,
-                password=self.password,
-            )
+            secret = hashlib.sha256(self.password.encode()).hexdigest()
+        # clients opened with a different backend or transport settings are not interchangeable
+        return (
+            self.host,
+            self.port,
+            self.username,
+            secret,
+            self._backend,
+            self.compression,
+            self.keepalive_interval,
+            self.tcp_nodelay,
+        )
+
+    def _connect(self) -> SSHBackend:
+        connection = self._backend.connect(
+            host=self.host,
+            port=self.port,
+            username=self.username,
+            password=None if self._is_passphrase else self.password,
+            key_file=self.key_file,
+            passphrase=self.password if self._is_passphrase else None,
+            compression=self.compression,
+            keepalive_interval=self.keepalive_interval,
+            tcp_nodelay=self.tcp_nodelay,
+        )
         self._is_connected = True
+        return connection
+
+    def _acquire(self) -> SSHBackend:
+        connection = pool.acquire(self._key(), self.max_connections)
+        if connection is None:
+            try:
+                return self._connect()
+            except BaseException:
+                pool.discard(self._key())
+                raise
+        return connection
+
+    def _release(self, connection: SSHBackend) -> None:
+        pool.release(self._key(), connection)
 
     def execute_command(
         self,
         command: str,
         timeout: Optional[Optional[float]] = None,
+        on_stdout: Optional[OutputCallback] = None,
+        on_stderr: Optional[OutputCallback] = None,
     ) -> ExecCommandResponse:
         """
         Executes a command on the remote SSH server.
 
+        The SSH session is borrowed from a pool shared by all the connections to the same host and user, and returned to it once the command completed.
+        If `max_connections` sessions are already busy, the command waits for one of them to be returned.
+        If the borrowed session turns out to be broken, it is discarded and the command is retried once on a freshly opened session.
+
+        Args:
+            command (str): The command to execute on the remote server.
+            timeout (Optional[float], optional): The maximum time in seconds to wait for the command to complete, reading its output included.
+                Defaults to None.
+            on_stdout (Optional[Callable[[bytes], None]], optional): Called with each chunk of standard output as soon as it is received.
+                The streamed chunks are not kept in the returned 'stdout'. Defaults to None.
+            on_stderr (Optional[Callable[[bytes], None]], optional): Called with each chunk of standard error as soon as it is received.
+                The streamed chunks are not kept in the returned 'stderr'. Defaults to None.
+
+        Returns:
+            ExecCommandResponse: A dictionary containing 'stdout' and 'stderr' output from the executed command.
+
+        Raises:
+            socket.timeout: If the command did not complete within `timeout` seconds.
+            Any exceptions raised by the underlying SSH client during connection or command execution.
+        """
+        connection = self._acquire()
+        try:
+            try:
+                response = connection.execute(command, timeout, on_stdout, on_stderr)
+            except StaleConnectionError:
+                connection.close()
+                connection = self._connect()
+                response = connection.execute(command, timeout, on_stdout, on_stderr)
+        except BaseException:
+            pool.discard(self._key(), connection)
+            raise
+        self._release(connection)
+        return response
+
+    async def aexecute_command(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+    ) -> ExecCommandResponse:
+        """
+        Executes a command on the remote SSH server without blocking the event loop.
+
+        The command runs through `execute_command` in a worker thread, with its own pooled SSH client.
+
         Args:
             command (str): The command to execute on the remote server.
             timeout (Optional[float], optional): The maximum time in seconds to wait for command execution. Defaults to None.
@@ -92,12 +194,7 @@ class SSHConnection:
         Raises:
             Any exceptions raised by the underlying SSH client during connection or command execution.
         """
-        if not self._is_connected:
-            self._connect()
-        _, stdout, stderr = self._client.exec_command(command=command, timeout=timeout)
-        output = stdout.read().decode()
-        error = stderr.read().decode()
-        return {"stderr": error, "stdout": output}
+        return await asyncio.to_thread(self.execute_command, command, timeout)
 
     def _close(self) -> None:
-        self._client.close()
+        pool.clear(self._key())
@@ -0,0 +1,89 @@
+import threading
+
+from typing import Optional
+from open_sandboxes.ssh_connection.backends import SSHBackend
+
+# (host, port, username, auth fingerprint, backend, compression, keepalive interval, TCP_NODELAY)
+PoolKey = tuple[str, int, str, str, type[SSHBackend], bool, int, bool]
+
+_POOL: dict[PoolKey, list[SSHBackend]] = {}
+_OPEN: dict[PoolKey, int] = {}
+_POOL_LOCK = threading.Condition()
+
+
+def acquire(key: PoolKey, max_connections: int) -> Optional[SSHBackend]:
+    """
+    Pop a live client from the pool, discarding any dead ones found along the way.
+
+    If the pool holds no idle client for `key`, a slot is reserved for a new connection, waiting for one to be released or discarded
+    if `max_connections` clients are already open. The caller must then open the client and hand it back with `release`, or free the
+    slot with `discard` if it could not be opened.
+
+    Args:
+        key (PoolKey): The key of the pool, one per server, user and connection settings.
+        max_connections (int): The maximum number of clients open at the same time for `key`.
+
+    Returns:
+        Optional[SSHBackend]: A connected client, or None if a slot was reserved to open a new one.
+    """
+    while True:
+        with _POOL_LOCK:
+            while not _POOL.get(key):
+                if _OPEN.get(key, 0) < max_connections:
+                    _OPEN[key] = _OPEN.get(key, 0) + 1
+                    return None
+                _POOL_LOCK.wait()
+            client = _POOL[key].pop()
+        if client.is_alive():
+            return client
+        discard(key, client)
+
+
+def release(key: PoolKey, client: SSHBackend) -> None:
+    """
+    Push a client back to the pool so that it can be reused by other connections.
+
+    The client is discarded instead if it is no longer alive.
+
+    Args:
+        key (PoolKey): The key of the pool, one per server, user and connection settings.
+        client (SSHBackend): The client to return to the pool.
+    """
+    if not client.is_alive():
+        discard(key, client)
+        return
+    with _POOL_LOCK:
+        _POOL.setdefault(key, []).append(client)
+        _POOL_LOCK.notify()
+
+
+def discard(key: PoolKey, client: Optional[SSHBackend] = None) -> None:
+    """
+    Close a client borrowed from the pool and free its slot for a new connection.
+
+    Args:
+        key (PoolKey): The key of the pool, one per server, user and connection settings.
+        client (Optional[SSHBackend]): The client to close, or None if the reserved client could not be opened. Defaults to None.
+    """
+    try:
+        if client is not None:
+            client.close()
+    finally:
+        with _POOL_LOCK:
+            _OPEN[key] -= 1
+            _POOL_LOCK.notify()
+
+
+def clear(key: Optional[PoolKey] = None) -> None:
+    """
+    Close and remove the idle clients for `key`, or for every key if `key` is None.
+
+    Args:
+        key (Optional[PoolKey]): The key of the pool to clear. Defaults to None.
+    """
+    with _POOL_LOCK:
+        keys = list(_POOL) if key is None else [key]
+        pools = [(k, _POOL.pop(k, [])) for k in keys]
+    for k, clients in pools:
+        for client in clients:
+            discard(k, client)
@@ -1,16 +1,19 @@
 from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Sequence
 
 from open_sandboxes.models import PyprojectDependency
 
 
-@dataclass
+@dataclass(frozen=True)
 class PyprojectConfig:
     """
     Represents the configuration for a Python project's `pyproject.toml` file.
 
     Attributes:
-        dependencies (list[PyprojectDependency]):
-            A list of dependencies required by the project, each represented as a PyprojectDependency.
+        dependencies (Sequence[PyprojectDependency]):
+            The dependencies required by the project, each represented as a PyprojectDependency.
+            They are copied into a tuple, so that the configuration cannot change after it has been created.
         title (str):
             The name of the project. Defaults to "my-project".
         python_min_version (str):
@@ -21,25 +24,39 @@ class PyprojectConfig:
     Methods:
         to_str() -> str:
             Generates a string representation of the configuration in `pyproject.toml` format.
+            The string is rendered once and cached on the instance.
     """
 
-    dependencies: list[PyprojectDependency]
+    dependencies: Sequence[PyprojectDependency]
     title: str = field(default="my-project")
     python_min_version: str = field(default="3.13")
     python_max_version: str = field(default="4")
 
-    def to_str(self) -> str:
-        deps = ""
-        for dependency in self.dependencies:
-            deps += f'    "{dependency["name"]}{dependency["version_constraints"]}",\n'
-        deps = deps.strip(",\n")
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self,
+            "dependencies",
+            tuple(
+                PyprojectDependency(**dependency) for dependency in self.dependencies
+            ),
+        )
+
+    @cached_property
+    def _rendered(self) -> str:
+        deps = ",\n".join(
+            f'    "{dependency["name"]}{dependency["version_constraints"]}"'
+            for dependency in self.dependencies
+        )
+        if deps:
+            deps = f"\n{deps}\n"
         return f"""
 [project]
 name = "{self.title}"
 version = "0.1.0"
 description = "Add your description here"
 requires-python = ">={self.python_min_version},<{self.python_max_version}"
-dependencies = [
-    {deps}
-]
+dependencies = [{deps}]
 """
+
+    def to_str(self) -> str:
+        return self._rendered
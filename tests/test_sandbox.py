@@ -1,11 +1,15 @@
+import asyncio
+import os
+import re
 import pytest
 
+from pathlib import Path
 from typing import Optional, Any
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from open_sandboxes.sandbox import Sandbox
 from open_sandboxes.ssh_connection import SSHConnection
 from open_sandboxes.uv_config import PyprojectConfig
-from open_sandboxes.models import CodeOutput
+from open_sandboxes.models import CodeOutput, ResourceLimits
 
 
 def test_sandbox_init() -> None:
@@ -41,6 +45,13 @@ def test_sandbox_init() -> None:
             remote_connection=conn,
             pyproject_file_path="non-existing.toml",
         )
+    for invalid_path in ["non-existing.toml", "testfiles"]:
+        with pytest.raises(ValueError):
+            Sandbox(
+                name="sandbox-1",
+                remote_connection=conn,
+                pyproject_file_path=invalid_path,
+            )
 
 
 def test_sandbox_from_connection_args() -> None:
@@ -73,7 +84,7 @@ def test_sandbox_run_code() -> None:
         content = f.read()
     sandbox.pyproject = content
     sandbox.name = "sandbox-1"
-    sandbox.run_code.return_value = {"output": "hello world!", "error": ""}
+    sandbox.run_code.return_value = CodeOutput(output="hello world!", error="")
     res = sandbox.run_code("print('hello world!')")
     assert res["output"] == "hello world!"
     assert res["error"] == ""
@@ -130,7 +141,7 @@ EOF
 cd /tmp/hello/ && \
 uv run script.py
 '"""
-    return {"output": command, "error": ""}
+    return CodeOutput(output=command, error="")
 
 
 @patch("open_sandboxes.sandbox.Sandbox.run_code", new_callable=MagicMock)
@@ -168,3 +179,255 @@ def test_sandbox_run_code_options(mock: MagicMock) -> None:
         "docker run --pids-limit 100 --cpus 1 -m 512m --device-read-bps=/dev/sda:10mb --device-write-bps=/dev/sda:10mb"
         in result["output"]
     )
+
+
+def test_sandbox_run_code_batch() -> None:
+    conn = MagicMock()
+    sandbox = Sandbox(
+        name="sandbox-1",
+        remote_connection=conn,
+        pyproject_file_path="testfiles/custom.pyproject.toml",
+    )
+
+    def execute_command(command: str, timeout: Optional[float] = None) -> Any:
+        tag = re.findall(r"__OS_BEGIN_([0-9a-f]+)_", command)[0]
+        return {
+            "stdout": f"__OS_BEGIN_{tag}_0__\nfirst\n__OS_END_{tag}_0__\n"
+            f"__OS_BEGIN_{tag}_1__\nsecond__OS_END_{tag}_1__\n",
+            "stderr": f"pulling image\n__OS_BEGIN_{tag}_0__\n__OS_END_{tag}_0__\n"
+            f"__OS_BEGIN_{tag}_1__\nboom\n",
+        }
+
+    conn.execute_command.side_effect = execute_command
+    results = sandbox.run_code_batch(["print('first')", "print('second', end='')"])
+    assert results == [
+        CodeOutput(output="first\n", error="pulling image\n"),
+        CodeOutput(output="second", error="pulling image\nboom\n"),
+    ]
+    command = conn.execute_command.call_args.args[0]
+    assert command.count("docker run") == 1
+    assert "script_0.py" in command and "script_1.py" in command
+    assert sandbox.run_code_batch([]) == []
+    conn.execute_command.assert_called_once()
+
+
+def test_sandbox_run_code_command() -> None:
+    conn = MagicMock()
+    conn.execute_command.return_value = {"stdout": "hello\n", "stderr": ""}
+    sandbox = Sandbox(
+        name="sandbox-1",
+        remote_connection=conn,
+        pyproject_file_path="testfiles/custom.pyproject.toml",
+    )
+    code = "print('it\\'s')\nEOF\n"
+    res = sandbox.run_code(code, environment={"NAME": "it's $HOME", "COUNT": 1})
+    assert res == CodeOutput(output="hello\n", error="")
+    command = conn.execute_command.call_args.args[0]
+    assert command.startswith(
+        "docker run -i --pids-limit 100 --cpus 1 -m 512m --device-read-bps=/dev/sda:10mb --device-write-bps=/dev/sda:10mb --rm ghcr.io/astral-sh/uv:alpine /bin/sh <<'"
+    )
+    assert f"<<'{sandbox._eof}'\n{code}\n{sandbox._eof}\n" in command
+    assert sandbox.pyproject in command
+    assert "export COUNT=1 && export NAME='it'\"'\"'s $HOME'\n" in command
+    assert command.endswith(f"{sandbox._command_eof}\n")
+
+
+def test_sandbox_run_code_template(tmp_path: Path) -> None:
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text('[project]\nname = "$project"\n')
+    conn = MagicMock()
+    conn.execute_command.return_value = {"stdout": "", "stderr": ""}
+    sandbox = Sandbox(
+        name="sandbox-1", remote_connection=conn, pyproject_file_path=str(pyproject)
+    )
+    sandbox.run_code("print('$code')")
+    first = conn.execute_command.call_args.args[0]
+    assert 'name = "$project"\n' in first
+    assert "print('$code')\n" in first
+    assert "export" not in first
+    sandbox.run_code("print('$code')", cpus=2)
+    second = conn.execute_command.call_args.args[0]
+    assert second.startswith("docker run -i --pids-limit 100 --cpus 2 ")
+    assert first.split("\n", 1)[1] == second.split("\n", 1)[1]
+
+
+def test_sandbox_start_stop() -> None:
+    conn = MagicMock()
+    conn.execute_command.return_value = {"stdout": "started\n", "stderr": ""}
+    sandbox = Sandbox(
+        name="sandbox-1",
+        remote_connection=conn,
+        pyproject_file_path="testfiles/custom.pyproject.toml",
+    )
+    sandbox.start(cpus=2)
+    assert sandbox._started
+    command = conn.execute_command.call_args.args[0]
+    assert command.startswith(
+        "docker run -d --pids-limit 100 --cpus 2 -m 512m --device-read-bps=/dev/sda:10mb --device-write-bps=/dev/sda:10mb --name sandbox-sandbox-1 ghcr.io/astral-sh/uv:alpine tail -f /dev/null >/dev/null && docker exec -i sandbox-sandbox-1 /bin/sh <<'"
+    )
+    assert "cat > pyproject.toml" in command
+    sandbox.run_code("print('hello')")
+    command = conn.execute_command.call_args.args[0]
+    assert command.startswith("docker exec -i sandbox-sandbox-1 /bin/sh <<'")
+    assert "cd /tmp/sandbox-1\n" in command
+    assert "pyproject.toml" not in command
+    sandbox.run_code_batch(["print('hello')"])
+    assert "pyproject.toml" not in conn.execute_command.call_args.args[0]
+    sandbox.run_code("print('hello')", memory=1024)
+    command = conn.execute_command.call_args.args[0]
+    assert command.startswith(
+        "docker update --pids-limit 100 --cpus 2 --memory 1024m --memory-swap 2048m sandbox-sandbox-1 >/dev/null && docker exec -i sandbox-sandbox-1 /bin/sh"
+    )
+    sandbox.run_code("print('hello')", memory=1024)
+    command = conn.execute_command.call_args.args[0]
+    assert command.startswith("docker exec -i sandbox-sandbox-1 /bin/sh")
+    conn.execute_command.side_effect = TimeoutError()
+    with pytest.raises(TimeoutError):
+        sandbox.run_code("print('hello')", memory=2048)
+    conn.execute_command.side_effect = None
+    sandbox.run_code("print('hello')", memory=2048)
+    command = conn.execute_command.call_args.args[0]
+    assert command.startswith(
+        "docker update --pids-limit 100 --cpus 2 --memory 2048m --memory-swap 4096m sandbox-sandbox-1 >/dev/null && "
+    )
+    with pytest.raises(ValueError):
+        sandbox.run_code("print('hello')", read_rate="1mb")
+    sandbox.stop()
+    assert not sandbox._started
+    assert conn.execute_command.call_args.args[0] == "docker rm -f sandbox-sandbox-1"
+    sandbox.run_code("print('hello')")
+    command = conn.execute_command.call_args.args[0]
+    assert command.startswith("docker run -i ")
+    conn.execute_command.return_value = {"stdout": "", "stderr": "no docker"}
+    with pytest.raises(RuntimeError):
+        sandbox.start()
+
+
+def test_sandbox_arun_code_batch() -> None:
+    conn = MagicMock()
+    running = 0
+    max_running = 0
+
+    async def aexecute_command(command: str, timeout: Optional[float] = None) -> Any:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        code = command.split("script.py <<'")[1].split("\n")[1]
+        return {"stdout": code, "stderr": ""}
+
+    conn.aexecute_command = AsyncMock(side_effect=aexecute_command)
+    sandbox = Sandbox(
+        name="sandbox-1",
+        remote_connection=conn,
+        pyproject_file_path="testfiles/custom.pyproject.toml",
+    )
+    codes = [f"print({i})" for i in range(6)]
+    results = asyncio.run(sandbox.arun_code_batch(codes, max_concurrency=2))
+    assert [result["output"] for result in results] == codes
+    assert max_running == 2
+    result = asyncio.run(sandbox.arun_code("print('hello')"))
+    assert result == CodeOutput(output="print('hello')", error="")
+
+
+def test_sandbox_run_code_streaming() -> None:
+    conn = MagicMock()
+    conn.execute_command.return_value = {"stdout": "", "stderr": ""}
+    sandbox = Sandbox(
+        name="sandbox-1",
+        remote_connection=conn,
+        pyproject_file_path="testfiles/custom.pyproject.toml",
+    )
+    chunks: list[bytes] = []
+    sandbox.run_code("print('hello')", on_output=chunks.append)
+    assert conn.execute_command.call_args.kwargs["on_stdout"] == chunks.append
+    assert conn.execute_command.call_args.kwargs["on_stderr"] is None
+
+
+def test_sandbox_pyproject_cache(tmp_path: Path) -> None:
+    conn = MagicMock()
+    path = tmp_path / "pyproject.toml"
+    path.write_text('[project]\nname = "first"\n', encoding="utf-8")
+    first = Sandbox(
+        name="sandbox-1", remote_connection=conn, pyproject_file_path=str(path)
+    )
+    with (
+        patch("open_sandboxes.sandbox.Path.read_text") as read_text,
+        patch("open_sandboxes.sandbox.os.stat", wraps=os.stat) as stat,
+    ):
+        second = Sandbox(
+            name="sandbox-2", remote_connection=conn, pyproject_file_path=str(path)
+        )
+        read_text.assert_not_called()
+        stat.assert_called_once()
+    assert first.pyproject == second.pyproject == '[project]\nname = "first"\n'
+    path.write_text('[project]\nname = "second"\n', encoding="utf-8")
+    mtime_ns = path.stat().st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    third = Sandbox(
+        name="sandbox-3", remote_connection=conn, pyproject_file_path=str(path)
+    )
+    assert third.pyproject == '[project]\nname = "second"\n'
+    with pytest.raises(ValueError):
+        Sandbox(
+            name="sandbox-4", remote_connection=conn, pyproject_file_path=str(tmp_path)
+        )
+
+
+def test_sandbox_default_limits() -> None:
+    with pytest.raises(ValueError):
+        ResourceLimits(memory=0)
+    conn = MagicMock()
+    conn.execute_command.return_value = {"stdout": "", "stderr": ""}
+    limits = ResourceLimits(cpus=2, memory=1024, read_rate="20mb")
+    sandbox = Sandbox(
+        name="sandbox-1",
+        remote_connection=conn,
+        pyproject_file_path="testfiles/custom.pyproject.toml",
+        default_limits=limits,
+    )
+    assert sandbox._get_limits_flags() is limits.to_flags()
+    sandbox.run_code("print('hello')")
+    assert conn.execute_command.call_args.args[0].startswith(
+        "docker run -i --pids-limit 100 --cpus 2 -m 1024m --device-read-bps=/dev/sda:20mb --device-write-bps=/dev/sda:10mb --rm"
+    )
+    sandbox.run_code("print('hello')", memory=256, write_rate="1mb")
+    assert conn.execute_command.call_args.args[0].startswith(
+        "docker run -i --pids-limit 100 --cpus 2 -m 256m --device-read-bps=/dev/sda:20mb --device-write-bps=/dev/sda:1mb --rm"
+    )
+
+
+def test_sandbox_warmup() -> None:
+    conn = MagicMock()
+    conn.host, conn.port = "warmup-host", 22
+    conn.execute_command.return_value = {"stdout": "", "stderr": "pull denied"}
+    sandbox = Sandbox(
+        name="sandbox-1",
+        remote_connection=conn,
+        pyproject_file_path="testfiles/custom.pyproject.toml",
+    )
+    with pytest.raises(RuntimeError):
+        sandbox.warmup()
+    conn.execute_command.return_value = {"stdout": "ready\n", "stderr": ""}
+    sandbox.warmup()
+    assert conn.execute_command.call_args.args[0] == (
+        "docker pull -q ghcr.io/astral-sh/uv:alpine && docker run --rm ghcr.io/astral-sh/uv:alpine true && echo ready"
+    )
+    other = Sandbox(
+        name="sandbox-2",
+        remote_connection=conn,
+        pyproject_file_path="testfiles/custom.pyproject.toml",
+    )
+    other.warmup()
+    assert conn.execute_command.call_count == 2
+
+
+def test_code_output() -> None:
+    res = CodeOutput(output="hello\n", error="warning\n")
+    assert res.output == res["output"] == res[0] == "hello\n"
+    assert res.error == res["error"] == res[1] == "warning\n"
+    output, error = res
+    assert (output, error) == ("hello\n", "warning\n")
+    with pytest.raises(KeyError):
+        res["stdout"]
@@ -1,20 +1,41 @@
+import asyncio
+import os
+import re
+import socket
+import threading
 import pytest
 
-from typing import Any, Optional
-from paramiko import SSHClient
+from types import SimpleNamespace
+from typing import Any, Optional, cast
+from unittest.mock import AsyncMock, MagicMock, patch
+from paramiko import SSHClient, SSHException
 from open_sandboxes.models import ExecCommandResponse
-from open_sandboxes.ssh_connection import SSHConnection
+from open_sandboxes.ssh_connection import (
+    AsyncSSHConnection,
+    ParamikoBackend,
+    SSHBackend,
+    SSHConnection,
+    Ssh2Backend,
+    pool,
+)
+from open_sandboxes.ssh_connection.backends import (
+    OutputCallback,
+    StaleConnectionError,
+    get_backend,
+)
 
 
 class MockSSHConnection(SSHConnection):
-    def _connect(self) -> None:
+    def _connect(self) -> ParamikoBackend:
         self._is_connected = True
-        return None
+        return ParamikoBackend(SSHClient())
 
     def execute_command(
         self,
         command: str,
         timeout: Optional[float] = None,
+        on_stdout: Optional[OutputCallback] = None,
+        on_stderr: Optional[OutputCallback] = None,
         environment: Optional[dict[str, Any]] = None,
     ) -> ExecCommandResponse:
         if not self._is_connected:
@@ -29,7 +50,10 @@ def test_ssh_connection_init() -> None:
     conn = SSHConnection(host="0.0.0.0", port=22, username="test", password="test")
     assert not conn._is_connected
     assert not conn._is_passphrase
-    assert isinstance(conn._client, SSHClient)
+    assert conn.max_connections == 10
+    assert conn.keepalive_interval == 30
+    assert conn.compression
+    assert conn.tcp_nodelay
     with pytest.raises(ValueError):
         SSHConnection(host="0.0.0.0", port=22, username="test")
     with pytest.raises(ValueError):
@@ -49,11 +73,20 @@ def test_ssh_connection_init() -> None:
     )
     assert conn2.password == "test"
     assert conn2._is_passphrase
+    assert conn2._key()[:4] == ("0.0.0.0", 22, "test", "/path/to/.ssh/key")
+    assert conn1._key()[3] != "hello"
+    assert (
+        conn1._key()
+        == SSHConnection(
+            host="0.0.0.0", port=22, username="test", password="hello"
+        )._key()
+    )
 
 
 def test_ssh_connection_connect() -> None:
     conn = MockSSHConnection(host="0.0.0.0", port=22, username="test", password="test")
-    conn._connect()
+    backend = conn._connect()
+    assert isinstance(backend.client, SSHClient)
     assert conn._is_connected
 
 
@@ -64,3 +97,434 @@ def test_ssh_connection_exec() -> None:
     assert conn._is_connected
     ret = conn.execute_command("ls -la")
     assert ret["stderr"] == "Command not recognized" and ret["stdout"] == ""
+
+
+def _mock_client(alive: bool = True) -> MagicMock:
+    client = MagicMock()
+    client.is_alive.return_value = alive
+    client.get_transport.return_value.is_active.return_value = alive
+    return client
+
+
+@pytest.mark.parametrize("compression", [True, False])
+def test_ssh_connection_compression(compression: bool) -> None:
+    conn = SSHConnection(
+        host="0.0.0.0",
+        port=22,
+        username="test",
+        password="test",
+        compression=compression,
+        backend="paramiko",
+    )
+    with patch(
+        "open_sandboxes.ssh_connection.backends.paramiko.SSHClient"
+    ) as client_cls:
+        conn._connect()
+    assert client_cls.return_value.connect.call_args.kwargs["compress"] is compression
+
+
+@pytest.mark.parametrize("tcp_nodelay", [True, False])
+def test_ssh_connection_socket_options(tcp_nodelay: bool) -> None:
+    conn = SSHConnection(
+        host="0.0.0.0",
+        port=22,
+        username="test",
+        password="test",
+        tcp_nodelay=tcp_nodelay,
+        backend="paramiko",
+    )
+    with socket.socket() as sock:
+        with patch(
+            "open_sandboxes.ssh_connection.backends.paramiko.SSHClient"
+        ) as client_cls:
+            client_cls.return_value.get_transport.return_value.sock = sock
+            conn._connect()
+        transport = client_cls.return_value.get_transport.return_value
+        transport.set_keepalive.assert_called_once_with(30)
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+        assert (
+            bool(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)) is tcp_nodelay
+        )
+
+
+def _pool_client(conn: SSHConnection, client: Any) -> None:
+    assert pool.acquire(conn._key(), conn.max_connections) is None
+    pool.release(conn._key(), client)
+
+
+def test_ssh_connection_pool() -> None:
+    key: pool.PoolKey = (
+        "0.0.0.0",
+        22,
+        "test",
+        "secret",
+        ParamikoBackend,
+        True,
+        30,
+        True,
+    )
+    assert pool.acquire(key, max_connections=2) is None
+    first = _mock_client()
+    pool.release(key, first)
+    assert pool.acquire(key, max_connections=2) is first
+    assert pool.acquire(key, max_connections=2) is None
+    dead = _mock_client(alive=False)
+    pool.release(key, dead)
+    dead.close.assert_called_once()
+    assert pool.acquire(key, max_connections=2) is None
+    second = _mock_client()
+    pool.release(key, first)
+    pool.release(key, second)
+    assert pool.acquire(key, max_connections=2) is second
+    pool.release(key, second)
+    pool.clear(key)
+    first.close.assert_called_once()
+    second.close.assert_called_once()
+    assert pool._OPEN[key] == 0
+
+
+def test_ssh_connection_pool_key() -> None:
+    paramiko_conn = SSHConnection(
+        host="0.0.0.0", port=22, username="test", password="test", backend="paramiko"
+    )
+    client = _mock_client()
+    _pool_client(paramiko_conn, client)
+    settings: list[dict[str, Any]] = [
+        {"compression": False},
+        {"keepalive_interval": 0},
+        {"tcp_nodelay": False},
+    ]
+    for options in settings:
+        conn = SSHConnection(
+            host="0.0.0.0",
+            port=22,
+            username="test",
+            password="test",
+            backend="paramiko",
+            **options,
+        )
+        assert conn._key() != paramiko_conn._key()
+    with patch("open_sandboxes.ssh_connection.backends.Session", new=object):
+        ssh2_conn = SSHConnection(
+            host="0.0.0.0", port=22, username="test", password="test", backend="ssh2"
+        )
+    fresh = _mock_client()
+    with patch.object(ssh2_conn, "_connect", return_value=fresh):
+        assert ssh2_conn._acquire() is fresh
+    ssh2_conn._release(fresh)
+    assert pool.acquire(paramiko_conn._key(), 10) is client
+    pool.release(paramiko_conn._key(), client)
+    paramiko_conn._close()
+    ssh2_conn._close()
+    client.close.assert_called_once()
+    fresh.close.assert_called_once()
+
+
+def test_ssh_connection_pool_limit() -> None:
+    key: pool.PoolKey = (
+        "0.0.0.0",
+        22,
+        "test",
+        "limit",
+        ParamikoBackend,
+        True,
+        30,
+        True,
+    )
+    assert pool.acquire(key, max_connections=1) is None
+    client = _mock_client()
+    borrowed: list[Optional[SSHBackend]] = []
+    waiter = threading.Thread(
+        target=lambda: borrowed.append(pool.acquire(key, max_connections=1))
+    )
+    waiter.start()
+    waiter.join(0.1)
+    assert waiter.is_alive()
+    pool.release(key, client)
+    waiter.join(1)
+    assert borrowed == [client]
+    pool.discard(key, client)
+    assert pool.acquire(key, max_connections=1) is None
+    pool.discard(key)
+    assert pool._OPEN[key] == 0
+
+
+class FakeShell:
+    def __init__(self, transport: Any, stdout: bytes, stderr: bytes) -> None:
+        self._transport = transport
+        self._stdout = stdout
+        self._stderr = stderr
+        self._out = b""
+        self._err = b""
+        self.closed = False
+        self.sent: list[bytes] = []
+        self._read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"x")
+
+    def fileno(self) -> int:
+        return self._read_fd
+
+    def get_transport(self) -> Any:
+        return self._transport
+
+    def exec_command(self, command: str) -> None:
+        assert command == "/bin/sh"
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        return None
+
+    def sendall(self, data: bytes) -> None:
+        self.sent.append(data)
+        marker = re.findall(rb"printf '%s\\n' (\S+)", data)[0]
+        self._out += self._stdout + marker + b"\n"
+        self._err += self._stderr + marker + b"\n"
+
+    def recv_ready(self) -> bool:
+        return bool(self._out)
+
+    def recv_stderr_ready(self) -> bool:
+        return bool(self._err)
+
+    def recv(self, size: int) -> bytes:
+        data, self._out = self._out[:size], self._out[size:]
+        return data
+
+    def recv_stderr(self, size: int) -> bytes:
+        data, self._err = self._err[:size], self._err[size:]
+        return data
+
+    def exit_status_ready(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_ssh_connection_exec_reuses_pooled_client() -> None:
+    conn = SSHConnection(host="0.0.0.0", port=22, username="test", password="test")
+    client = _mock_client()
+    shell = FakeShell(client.get_transport.return_value, b"hello", b"")
+    client.get_transport.return_value.open_session.return_value = shell
+    _pool_client(conn, ParamikoBackend(client))
+    ret = conn.execute_command("echo hello")
+    assert ret == {"stdout": "hello", "stderr": ""}
+    ret = conn.execute_command("echo hello")
+    assert ret == {"stdout": "hello", "stderr": ""}
+    client.get_transport.return_value.open_session.assert_called_once()
+    assert len(shell.sent) == 2
+    assert b"eval 'echo hello'" in shell.sent[0]
+    backend = cast(ParamikoBackend, pool.acquire(conn._key(), conn.max_connections))
+    assert backend.client is client
+    pool.discard(conn._key(), backend)
+    assert shell.closed
+    client.close.assert_called_once()
+
+
+class DeadShell(FakeShell):
+    def sendall(self, data: bytes) -> None:
+        # the shell exits before printing the markers
+        self.sent.append(data)
+        self._out += self._stdout
+        self._err += self._stderr
+
+    def exit_status_ready(self) -> bool:
+        return True
+
+
+@pytest.mark.parametrize("stdout", [b"", b"partial"])
+def test_ssh_connection_exec_shell_exited(stdout: bytes) -> None:
+    conn = SSHConnection(host="0.0.0.0", port=22, username="test", password="test")
+    client = _mock_client()
+    shell = DeadShell(client.get_transport.return_value, stdout, b"")
+    client.get_transport.return_value.open_session.return_value = shell
+    _pool_client(conn, ParamikoBackend(client))
+    fresh = _mock_client()
+    fresh.execute.return_value = {"stdout": "hello", "stderr": ""}
+    with patch.object(conn, "_connect", return_value=fresh):
+        if stdout:
+            with pytest.raises(SSHException):
+                conn.execute_command("echo hello")
+            fresh.execute.assert_not_called()
+        else:
+            ret = conn.execute_command("echo hello")
+            assert ret == {"stdout": "hello", "stderr": ""}
+    assert shell.closed
+    client.close.assert_called_once()
+    conn._close()
+
+
+class FakeChannel(FakeShell):
+    def __init__(self, stdout: bytes, stderr: bytes) -> None:
+        super().__init__(None, stdout, stderr)
+        self._out = stdout
+        self._err = stderr
+
+    def exit_status_ready(self) -> bool:
+        return True
+
+
+def _mock_exec_client(channel: FakeChannel) -> MagicMock:
+    client = _mock_client()
+    stdout = MagicMock()
+    stdout.channel = channel
+    client.exec_command.return_value = (MagicMock(), stdout, MagicMock())
+    return client
+
+
+def test_ssh_connection_exec_heredoc_fallback() -> None:
+    conn = SSHConnection(host="0.0.0.0", port=22, username="test", password="test")
+    client = _mock_exec_client(FakeChannel(b"hello", b""))
+    _pool_client(conn, ParamikoBackend(client))
+    command = 'cat << "EOF"\nhello\nEOF'
+    ret = conn.execute_command(command)
+    assert ret == {"stdout": "hello", "stderr": ""}
+    client.exec_command.assert_called_once_with(command=command, timeout=None)
+    client.get_transport.return_value.open_session.assert_not_called()
+    conn._close()
+
+
+def test_ssh_connection_exec_streaming() -> None:
+    conn = SSHConnection(host="0.0.0.0", port=22, username="test", password="test")
+    client = _mock_exec_client(FakeChannel(b"a" * 100_000, b"warning"))
+    _pool_client(conn, ParamikoBackend(client))
+    chunks: list[bytes] = []
+    ret = conn.execute_command("echo hello", on_stdout=chunks.append)
+    assert ret == {"stdout": "", "stderr": "warning"}
+    assert len(chunks) == 2 and b"".join(chunks) == b"a" * 100_000
+    client.exec_command.assert_called_once_with(command="echo hello", timeout=None)
+    client.get_transport.return_value.open_session.assert_not_called()
+    conn._close()
+
+
+def test_ssh_connection_exec_timeout() -> None:
+    conn = SSHConnection(host="0.0.0.0", port=22, username="test", password="test")
+    channel = FakeChannel(b"", b"")
+    channel.exit_status_ready = lambda: False  # type: ignore[method-assign]
+    client = _mock_exec_client(channel)
+    _pool_client(conn, ParamikoBackend(client))
+    with pytest.raises(socket.timeout):
+        conn.execute_command('cat << "EOF"\nhello\nEOF', timeout=0.05)
+    client.close.assert_called_once()
+    assert pool.acquire(conn._key(), conn.max_connections) is None
+    pool.discard(conn._key())
+
+
+def test_ssh_connection_backends() -> None:
+    pytest.importorskip("ssh2")
+    assert get_backend("paramiko") is ParamikoBackend
+    assert get_backend("ssh2") is Ssh2Backend
+    assert get_backend() is Ssh2Backend
+    with pytest.raises(ValueError):
+        get_backend("openssh")
+    with pytest.raises(ValueError):
+        SSHConnection(
+            host="0.0.0.0", port=22, username="test", password="test", backend="openssh"
+        )
+    with patch("open_sandboxes.ssh_connection.backends.Session", new=None):
+        assert get_backend() is ParamikoBackend
+        with pytest.raises(ImportError):
+            get_backend("ssh2")
+
+
+def test_ssh2_backend_connect_timeout() -> None:
+    pytest.importorskip("ssh2")
+    with socket.socket() as listener:
+        # accepts TCP connections through the backlog, but never sends an SSH banner
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        conn = SSHConnection(
+            host="127.0.0.1",
+            port=listener.getsockname()[1],
+            username="test",
+            password="test",
+            backend="ssh2",
+        )
+        with patch("open_sandboxes.ssh_connection.backends._BANNER_TIMEOUT", 0.2):
+            with pytest.raises(socket.timeout):
+                conn.execute_command("echo hello", timeout=5)
+    assert pool._OPEN[conn._key()] == 0
+
+
+@pytest.mark.parametrize("keepalive_interval", [0, 30])
+def test_ssh2_backend_keepalive(keepalive_interval: int) -> None:
+    pytest.importorskip("ssh2")
+    session = MagicMock()
+    session.keepalive_send.return_value = keepalive_interval
+    local, remote = socket.socketpair()
+    backend = Ssh2Backend(local, session, keepalive_interval)
+    assert backend.is_alive()
+    assert session.keepalive_send.call_count == bool(keepalive_interval)
+    remote.close()
+    assert not backend.is_alive()
+    backend.close()
+    assert local.fileno() == -1
+
+
+def test_ssh_connection_exec_retries_stale_connection() -> None:
+    conn = SSHConnection(host="0.0.0.0", port=22, username="test", password="test")
+    stale = _mock_client()
+    stale.execute.side_effect = StaleConnectionError("connection reset")
+    fresh = _mock_client()
+    fresh.execute.return_value = {"stdout": "hello", "stderr": ""}
+    _pool_client(conn, stale)
+    with patch.object(conn, "_connect", return_value=fresh):
+        ret = conn.execute_command("echo hello", timeout=5)
+    assert ret == {"stdout": "hello", "stderr": ""}
+    stale.close.assert_called_once()
+    fresh.execute.assert_called_once_with("echo hello", 5, None, None)
+    assert pool.acquire(conn._key(), conn.max_connections) is fresh
+    pool.release(conn._key(), fresh)
+    conn._close()
+
+
+def test_ssh_connection_dropped_by_server() -> None:
+    conn = SSHConnection(host="0.0.0.0", port=22, username="test", password="test")
+    client = _mock_client()
+    shell = FakeShell(client.get_transport.return_value, b"", b"")
+    shell.sendall = MagicMock(side_effect=EOFError())  # type: ignore[method-assign]
+    shell.close = MagicMock(side_effect=EOFError())  # type: ignore[method-assign]
+    client.get_transport.return_value.open_session.return_value = shell
+    fresh = _mock_client()
+    fresh.execute.return_value = {"stdout": "hello", "stderr": ""}
+    _pool_client(conn, ParamikoBackend(client))
+    with patch.object(conn, "_connect", return_value=fresh):
+        ret = conn.execute_command("echo hello")
+    assert ret == {"stdout": "hello", "stderr": ""}
+    shell.close.assert_called_once()
+    client.close.assert_called_once()
+    conn._close()
+    fresh.close.assert_called_once()
+
+
+def test_ssh_connection_aexec() -> None:
+    conn = MockSSHConnection(host="0.0.0.0", port=22, username="test", password="test")
+    ret = asyncio.run(conn.aexecute_command("docker ps -a"))
+    assert ret["stderr"] == "" and ret["stdout"] == "Test code successfully executed!"
+
+
+def test_async_ssh_connection() -> None:
+    asyncssh = pytest.importorskip("asyncssh")
+    conn = AsyncSSHConnection(
+        host="0.0.0.0", port=22, username="test", password="test", max_sessions=2
+    )
+    assert isinstance(conn, SSHConnection)
+    assert conn.max_sessions == 2
+    connection = MagicMock()
+    connection.is_closed.return_value = False
+    connection.run = AsyncMock(return_value=SimpleNamespace(stdout="hello", stderr=""))
+    with patch.object(
+        asyncssh, "connect", new=AsyncMock(return_value=connection)
+    ) as connect:
+
+        async def main() -> list[ExecCommandResponse]:
+            return list(
+                await asyncio.gather(
+                    *(conn.aexecute_command("echo hello") for _ in range(5))
+                )
+            )
+
+        results = asyncio.run(main())
+    assert results == [{"stdout": "hello", "stderr": ""}] * 5
+    connect.assert_awaited_once()
+    assert connect.call_args.kwargs["password"] == "test"
+    assert connection.run.await_count == 5
@@ -1,3 +1,4 @@
+import dataclasses
 import pytest
 
 from open_sandboxes.uv_config import PyprojectConfig
@@ -32,3 +33,25 @@ def test_pyproject_config(dependencies: list[PyprojectDependency]) -> None:
     assert custom_content.replace(" ", "").replace(
         "\n", ""
     ) == custom_config_str.replace(" ", "").replace("\n", "")
+
+
+def test_pyproject_config_is_frozen(dependencies: list[PyprojectDependency]) -> None:
+    config = PyprojectConfig(dependencies=dependencies)
+    assert isinstance(config.dependencies, tuple)
+    rendered = config.to_str()
+    assert config.to_str() is rendered
+    dependencies[0]["version_constraints"] = "<0.1"
+    assert config.to_str() == rendered
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        config.title = "other-project"  # type: ignore[misc]
+
+
+def test_pyproject_config_dependencies(
+    dependencies: list[PyprojectDependency],
+) -> None:
+    config = PyprojectConfig(dependencies=dependencies)
+    assert config.to_str().endswith(
+        'dependencies = [\n    "httpx>=0.28.1,<1",\n    "typing-extensions<5"\n]\n'
+    )
+    empty_config = PyprojectConfig(dependencies=[])
+    assert empty_config.to_str().endswith("dependencies = []\n")